@@ -1,18 +1,66 @@
 import os
 import boto3
+from botocore.config import Config
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 import csv
+import gzip
+import io
 import json
+import logging
+import orjson
+import threading
+import time
 import urllib.parse
-import uuid
 
-# Initialize AWS clients
-s3 = boto3.client('s3')
-kinesis = boto3.client('kinesis')
+# Lambda attaches a CloudWatch handler to the root logger; per-batch messages are
+# logged at DEBUG so they cost nothing unless explicitly enabled
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients once per container so warm invocations reuse them.
+# Adaptive retries add client-side rate limiting on throttling errors. Connections
+# are already reused through the pool; tcp_keepalive only sends TCP keepalive
+# probes so idle pooled sockets are not silently dropped between calls.
+client_config = Config(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    tcp_keepalive=True
+)
+s3 = boto3.client('s3', config=client_config)
+kinesis = boto3.client('kinesis', config=client_config)
 
 # Get the Kinesis stream name from environment variables
 KINESIS_STREAM_NAME = os.environ.get('KINESIS_STREAM_NAME')
 # Define the maximum number of records to send in a single PutRecords call
 KINESIS_BATCH_SIZE = 500
+# Define the maximum payload (data + partition keys) of a single PutRecords call
+KINESIS_BATCH_MAX_BYTES = 5 * 1024 * 1024
+# Retry settings for records rejected within a PutRecords call
+KINESIS_MAX_RETRIES = 10
+KINESIS_RETRY_BASE_DELAY = 0.1
+KINESIS_RETRY_MAX_DELAY = 2.0
+# Only these error codes are transient; anything else is logged and dropped
+KINESIS_RETRYABLE_ERRORS = ('ProvisionedThroughputExceededException', 'InternalFailure')
+# Number of PutRecords calls in flight at once, and how many built batches may
+# be queued or in flight before the CSV readers block. The batch limit is shared
+# by all range readers, so it bounds the memory of the whole invocation.
+KINESIS_MAX_WORKERS = 4
+KINESIS_MAX_PENDING_BATCHES = 8
+
+# botocore releases the GIL while waiting on the network, so a small pool lets
+# the next batch be built while earlier ones are still being sent
+kinesis_executor = ThreadPoolExecutor(max_workers=KINESIS_MAX_WORKERS)
+kinesis_pending_slots = threading.BoundedSemaphore(KINESIS_MAX_PENDING_BATCHES)
+
+# Opt-in: with S3_RANGE_PARTS > 1, objects at least S3_RANGE_MIN_BYTES large are
+# read as that many parallel byte-range GETs, since a single GET is limited by the
+# throughput of one connection. Ranges are split at b'\n', so only enable this for
+# CSVs with \n or \r\n line endings and no newlines inside quoted fields.
+S3_RANGE_MIN_BYTES = int(os.environ.get('S3_RANGE_MIN_BYTES', 100 * 1024 * 1024))
+S3_RANGE_PARTS = int(os.environ.get('S3_RANGE_PARTS', 1))
+# Separate from the Kinesis pool: range readers block on their own sends
+s3_range_executor = ThreadPoolExecutor(max_workers=S3_RANGE_PARTS)
 
 def lambda_handler(event, context):
     """
@@ -24,76 +72,264 @@ def lambda_handler(event, context):
     try:
         s3_record = event['Records'][0]['s3']
         bucket_name = s3_record['bucket']['name']
-        # The key may have URL-encoded characters (e.g., spaces as '+')
-        object_key = urllib.parse.unquote_plus(s3_record['object']['key'], encoding='utf-8')
+        # The key may have URL-encoded characters (e.g., spaces as '+');
+        # most keys have none, so only decode when there is something to decode
+        raw_key = s3_record['object']['key']
+        if '%' in raw_key or '+' in raw_key:
+            object_key = urllib.parse.unquote_plus(raw_key, encoding='utf-8')
+        else:
+            object_key = raw_key
     except (KeyError, IndexError) as e:
-        print(f"Error: Could not extract bucket/key from event. {e}")
+        logger.error("Could not extract bucket/key from event. %s", e)
         return {'statusCode': 400, 'body': 'Invalid S3 event format.'}
 
-    print(f"Processing file: s3://{bucket_name}/{object_key}")
+    logger.info("Processing file: s3://%s/%s", bucket_name, object_key)
 
     # 2. Get the CSV file content from S3
     try:
         response = s3.get_object(Bucket=bucket_name, Key=object_key)
-        # Decode the file content and split into lines
-        file_content = response['Body'].read().decode('utf-8').splitlines()
-        csv_reader = csv.reader(file_content)
+        body = response['Body']
+        object_size = response['ContentLength']
+        range_parts = 1
+        if S3_RANGE_PARTS > 1 and object_size >= S3_RANGE_MIN_BYTES:
+            # At most one range per byte, so every range after the first starts past byte 0
+            range_parts = min(S3_RANGE_PARTS, object_size)
+        if object_key.endswith('.gz') or response.get('ContentEncoding') == 'gzip':
+            # Decompress incrementally as the body is read. A gzip stream cannot
+            # be entered mid-way, so compressed objects are never range-split.
+            body = gzip.GzipFile(fileobj=body, mode='rb')
+            range_parts = 1
+        if range_parts > 1:
+            # The initial GET serves the first range; the others are fetched below
+            range_bounds = [object_size * i // range_parts for i in range(range_parts + 1)]
+            csv_reader = _csv_reader_for_lines(_iter_range_lines(body, 0, range_bounds[1]))
+        else:
+            # Stream-decode the body so the object is never held in memory in full;
+            # csv.reader pulls chunks from the StreamingBody on demand. newline=''
+            # leaves line endings (\n, \r\n or a lone \r) to csv.reader.
+            text = io.TextIOWrapper(body, encoding='utf-8', newline='')
+            csv_reader = csv.reader(text)
         # Assume the first row is the header
-        header = next(csv_reader)
+        header = tuple(next(csv_reader))
+        rows = _iter_csv_rows(csv_reader, header)
     except Exception as e:
-        print(f"Error getting or parsing S3 object: {e}")
+        logger.error("Error getting or parsing S3 object: %s", e)
         return {'statusCode': 500, 'body': 'Failed to process S3 object.'}
 
-    records_batch = []
-    records_sent_count = 0
+    # 3. Parse the rows and send them to Kinesis, one pipeline per byte range.
+    # The body is read while sending, so read and decode errors surface here too.
+    delivered = _RecordCounter()
+    try:
+        if range_parts > 1:
+            logger.info("Reading %d bytes as %d parallel ranges.", object_size, range_parts)
+            futures = [s3_range_executor.submit(_send_rows_to_kinesis, rows, delivered)]
+            for start, end in zip(range_bounds[1:-1], range_bounds[2:]):
+                futures.append(s3_range_executor.submit(
+                    _send_range_to_kinesis, bucket_name, object_key, start, end, header, delivered
+                ))
+            # Let every range finish before returning, even if one of them failed
+            wait(futures)
+            for future in futures:
+                future.result()
+        else:
+            _send_rows_to_kinesis(rows, delivered)
+    except Exception as e:
+        # Re-raise so the asynchronous S3 invocation counts as failed and is retried
+        # (or reaches the on-failure destination) instead of losing the rest of the
+        # file. A retry re-sends the records already delivered, so delivery is
+        # at-least-once and consumers must tolerate duplicates.
+        logger.error("Error reading or sending S3 object after %d records were sent: %s", delivered.value, e)
+        raise
+
+    records_sent_count = delivered.value
+    logger.info("Successfully processed and sent %d records from %s.", records_sent_count, object_key)
+    return {
+        'statusCode': 200,
+        'body': json.dumps(f'Successfully sent {records_sent_count} records.')
+    }
+
 
-    # 3. Process each row and send to Kinesis in batches
+class _RecordCounter:
+    """Thread-safe running total of the records Kinesis accepted."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def add(self, count):
+        with self._lock:
+            self.value += count
+
+
+def _send_rows_to_kinesis(rows, delivered):
+    """
+    Streams CSV rows (as header -> value dicts) through record building and
+    batching and sends the batches to Kinesis. The records Kinesis accepted
+    are added to `delivered` as each batch completes.
+    """
+    pending_batches = deque()
+
+    try:
+        # Only the batches queued for sending are kept alive at any time
+        for records_batch in _batch_records(_build_records(rows)):
+            # Wait for a free slot; slots are shared with the other range pipelines
+            kinesis_pending_slots.acquire()
+            future = kinesis_executor.submit(_send_batch_to_kinesis, records_batch)
+            future.add_done_callback(lambda _: kinesis_pending_slots.release())
+            pending_batches.append(future)
+            # Drop finished batches early, surfacing any unexpected exception
+            while pending_batches and pending_batches[0].done():
+                delivered.add(pending_batches.popleft().result())
+    finally:
+        # Wait for every in-flight batch, also when reading the rows failed part-way,
+        # so `delivered` is complete when the error reaches the handler
+        while pending_batches:
+            delivered.add(pending_batches.popleft().result())
+
+
+def _send_range_to_kinesis(bucket_name, object_key, start, end, header, delivered):
+    """Reads the CSV lines starting in bytes [start, end) of an object and sends them to Kinesis."""
+    # Start one byte early so a line beginning exactly at `start` is not skipped
+    response = s3.get_object(Bucket=bucket_name, Key=object_key, Range=f'bytes={start - 1}-')
+    lines = _iter_range_lines(response['Body'], start - 1, end, skip_partial_line=True)
+    _send_rows_to_kinesis(_iter_csv_rows(_csv_reader_for_lines(lines), header), delivered)
+
+
+def _iter_range_lines(body, offset, end, skip_partial_line=False):
+    """
+    Generator over the raw lines of a stream positioned at byte `offset` that
+    begin before byte `end`. For every range but the first, pass
+    `skip_partial_line` so the first (partial) line, which belongs to the
+    previous range, is skipped.
+    The stream is read past `end` only to finish the last line, then closed.
+    """
+    lines = _iter_raw_lines(body)
+    position = offset
+    try:
+        if skip_partial_line:
+            position += len(next(lines, b''))
+        for line in lines:
+            if position >= end:
+                break
+            position += len(line)
+            yield line
+    finally:
+        body.close()
+
+
+def _iter_raw_lines(body, chunk_size=64 * 1024):
+    """
+    Generator over the lines of a byte stream, keeping their line endings so
+    csv.reader can still join quoted fields that span several lines.
+    """
+    remainder = b''
+    for chunk in iter(lambda: body.read(chunk_size), b''):
+        lines = (remainder + chunk).split(b'\n')
+        remainder = lines.pop()
+        for line in lines:
+            yield line + b'\n'
+    if remainder:
+        yield remainder
+
+
+def _csv_reader_for_lines(lines):
+    """Builds a csv.reader over raw UTF-8 lines; splitting on newlines never cuts a character."""
+    return csv.reader(line.decode('utf-8') for line in lines)
+
+
+def _iter_csv_rows(csv_reader, header):
+    """Generator that zips csv.reader rows with the header into dicts."""
     for row in csv_reader:
-        # Create a dictionary from header and row values
-        record_data = dict(zip(header, row))
+        yield dict(zip(header, row))
 
-        # Prepare the record for the Kinesis PutRecords API call
-        # Data must be bytes, so we serialize the dictionary to a JSON string and encode it.
+
+def _build_records(rows):
+    """Generator that turns row dicts into Kinesis PutRecords entries."""
+    # Random per-invocation prefix; the row index makes each PartitionKey unique
+    partition_key_prefix = os.urandom(8).hex()
+    for i, row in enumerate(rows):
+        # Data must be bytes; orjson serializes the row dict straight to bytes.
         # PartitionKey is used by Kinesis to distribute data across shards.
-        # A random UUID is a good choice for even distribution.
-        kinesis_record = {
-            'Data': json.dumps(record_data) + '\n', # Add newline for downstream consumers
-            'PartitionKey': str(uuid.uuid4())
+        # Kinesis MD5-hashes the key, so prefix + row index spreads as evenly
+        # as a UUID without generating one per row.
+        yield {
+            'Data': orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE), # Add newline for downstream consumers
+            'PartitionKey': f"{partition_key_prefix}{i}"
         }
-        records_batch.append(kinesis_record)
 
-        # 4. When the batch is full, send it to Kinesis
-        if len(records_batch) == KINESIS_BATCH_SIZE:
-            _send_batch_to_kinesis(records_batch)
-            records_sent_count += len(records_batch)
-            records_batch = [] # Clear the batch
 
-    # 5. Send any remaining records in the last batch
-    if records_batch:
-        _send_batch_to_kinesis(records_batch)
-        records_sent_count += len(records_batch)
+def _batch_records(records):
+    """
+    Generator that groups records into PutRecords batches, flushing on
+    whichever of the record count or payload size limit is reached first.
+    """
+    batch = []
+    batch_bytes = 0
+    for record in records:
+        record_bytes = len(record['Data']) + len(record['PartitionKey'])
+        # Never flush an empty batch, even if this record alone exceeds the size limit
+        if batch and (len(batch) == KINESIS_BATCH_SIZE or batch_bytes + record_bytes > KINESIS_BATCH_MAX_BYTES):
+            # Yield a fresh list each time: sent batches are still in use by the sender threads
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(record)
+        batch_bytes += record_bytes
 
-    print(f"Successfully processed and sent {records_sent_count} records from {object_key}.")
-    return {
-        'statusCode': 200,
-        'body': json.dumps(f'Successfully sent {records_sent_count} records.')
-    }
+    if batch:
+        yield batch
 
 
 def _send_batch_to_kinesis(batch):
-    """Helper function to send a batch of records to Kinesis."""
+    """
+    Helper function to send a batch of records to Kinesis.
+
+    PutRecords is not atomic: individual records can fail while the rest
+    succeed. Failed records are picked out by index and resubmitted with
+    exponential backoff. The backoff is reset whenever a retry makes partial
+    progress, so a throttled shard does not slow down the whole batch.
+
+    Returns the number of records Kinesis accepted; records that fail with a
+    non-retryable error, or still fail after the last retry, are not counted.
+    """
+    pending = batch
+    delay = KINESIS_RETRY_BASE_DELAY
+    delivered = 0
     try:
-        response = kinesis.put_records(
-            StreamName=KINESIS_STREAM_NAME,
-            Records=batch
-        )
-        if response.get('FailedRecordCount', 0) > 0:
-            print(f"Warning: {response['FailedRecordCount']} records failed to be sent.")
-            # Basic error logging. For production, you might want to retry failed records.
-            for record in response.get('Records', []):
-                if 'ErrorCode' in record:
-                    print(f"  - Failed Record: {record['ErrorCode']}: {record['ErrorMessage']}")
-        else:
-            print(f"Successfully sent a batch of {len(batch)} records.")
+        for attempt in range(KINESIS_MAX_RETRIES + 1):
+            response = kinesis.put_records(
+                StreamName=KINESIS_STREAM_NAME,
+                Records=pending
+            )
+            failed_count = response.get('FailedRecordCount', 0)
+            delivered += len(pending) - failed_count
+            if failed_count == 0:
+                logger.debug("Successfully sent a batch of %d records.", len(pending))
+                return delivered
+
+            retry = []
+            for record, result in zip(pending, response['Records']):
+                if 'ErrorCode' not in result:
+                    continue
+                if result['ErrorCode'] in KINESIS_RETRYABLE_ERRORS:
+                    retry.append(record)
+                else:
+                    logger.error("Dropping record: %s: %s", result['ErrorCode'], result['ErrorMessage'])
+
+            if not retry:
+                return delivered
+            if attempt == KINESIS_MAX_RETRIES:
+                break
+
+            logger.warning("%d records failed to be sent, retrying %d.", failed_count, len(retry))
+            # Some records went through, so the shard is not fully throttled
+            if failed_count < len(pending):
+                delay = KINESIS_RETRY_BASE_DELAY
+            time.sleep(delay)
+            delay = min(delay * 2, KINESIS_RETRY_MAX_DELAY)
+            pending = retry
+
+        logger.error("%d records still failing after %d retries.", len(retry), KINESIS_MAX_RETRIES)
     except Exception as e:
-        print(f"Error sending batch to Kinesis: {e}")
\ No newline at end of file
+        logger.error("Error sending batch to Kinesis: %s", e)
+    return delivered
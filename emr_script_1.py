@@ -1,25 +1,45 @@
 import sys
 from pyspark.sql import SparkSession
-from pyspark.sql.functions import col
 
-def process_glue_data(input_db, input_table, output_db, output_table, columns_to_select):
+def create_spark_session():
+    """
+    Creates the SparkSession shared by every table processed in this job.
+
+    Hive support is enabled to interact with the Glue Catalog. Adaptive Query
+    Execution coalesces small post-shuffle partitions and picks broadcast joins
+    at runtime once small tables are joined in.
+    """
+    spark = SparkSession.builder \
+        .appName("GlueDataProcessing") \
+        .config("spark.sql.adaptive.enabled", "true") \
+        .config("spark.sql.adaptive.coalescePartitions.enabled", "true") \
+        .config("spark.sql.autoBroadcastJoinThreshold", "50MB") \
+        .config("spark.sql.parquet.enableVectorizedReader", "true") \
+        .config("spark.sql.parquet.filterPushdown", "true") \
+        .enableHiveSupport() \
+        .getOrCreate()
+
+    print("SparkSession created with Hive support.")
+    return spark
+
+
+def process_glue_data(spark, input_db, input_table, output_db, output_table, columns_to_select,
+                      partition_by=None, num_partitions=None):
     """
     Reads from a Glue table, selects columns, and writes to a new Glue table.
 
+    :param spark: The SparkSession to use; see create_spark_session.
     :param input_db: The Glue database of the source table.
     :param input_table: The Glue table name for the source data.
     :param output_db: The Glue database for the destination table.
     :param output_table: The Glue table name for the output data.
     :param columns_to_select: A list of column names to select.
+    :param partition_by: Optional list of columns to partition the output table by.
+    :param num_partitions: Optional number of partitions (output files) to write.
     """
     try:
-        # Initialize SparkSession with Hive support enabled to interact with Glue Catalog
-        spark = SparkSession.builder \
-            .appName("GlueDataProcessing") \
-            .enableHiveSupport() \
-            .getOrCreate()
-
-        print("SparkSession created with Hive support.")
+        # Resolve the unqualified source table against the input database
+        spark.catalog.setCurrentDatabase(input_db)
 
         # Construct the full table names
         source_table_name = f"{input_db}.{input_table}"
@@ -27,49 +47,75 @@ def process_glue_data(input_db, input_table, output_db, output_table, columns_to
 
         print(f"Reading data from Glue table: {source_table_name}")
 
-        # Read data from the Glue table
-        df = spark.table(source_table_name)
+        print(f"Selecting columns: {', '.join(columns_to_select)}")
 
-        print("Data read successfully. Source schema:")
-        df.printSchema()
+        # Read only the desired columns so the Parquet reader skips the rest
+        transformed_df = spark.read.table(input_table).select(*columns_to_select)
 
-        print(f"Selecting columns: {', '.join(columns_to_select)}")
-        
-        # Select the desired columns
-        transformed_df = df.select([col(c) for c in columns_to_select])
-        
-        print("Columns selected. Schema of transformed data:")
+        print("Data read successfully. Schema of transformed data:")
         transformed_df.printSchema()
 
         print(f"Writing transformed data to Glue table: {destination_table_name}")
 
+        # Control the number of output files instead of inheriting the source layout.
+        # When partitioning, shuffle by the partition columns so each partition
+        # directory is written by as few tasks as possible.
+        if partition_by:
+            if num_partitions:
+                transformed_df = transformed_df.repartition(num_partitions, *partition_by)
+            else:
+                transformed_df = transformed_df.repartition(*partition_by)
+        elif num_partitions:
+            transformed_df = transformed_df.repartition(num_partitions)
+
         # Write the transformed DataFrame back to S3, managed by Glue Catalog
-        # This will create a new table in Glue and write the data in Parquet format by default.
-        transformed_df.write.mode("overwrite").saveAsTable(destination_table_name)
+        # This will create a new table in Glue with snappy-compressed Parquet files.
+        writer = transformed_df.write \
+            .mode("overwrite") \
+            .format("parquet") \
+            .option("compression", "snappy")
+        if partition_by:
+            print(f"Partitioning output by: {', '.join(partition_by)}")
+            writer = writer.partitionBy(*partition_by)
+        writer.saveAsTable(destination_table_name)
 
         print("Data written successfully as a new Glue table.")
 
-        # Stop the SparkSession
-        spark.stop()
-        print("SparkSession stopped.")
-
     except Exception as e:
         print(f"An error occurred: {e}")
         sys.exit(1)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 6:
-        print("Usage: spark-submit process_glue_data.py <input_db> <input_table> <output_db> <output_table> <columns>")
+    if len(sys.argv) not in (6, 7, 8):
+        print("Usage: spark-submit process_glue_data.py <input_db> <input_tables> <output_db> <output_tables> <columns> "
+              "[<partition_columns>] [<num_partitions>]")
         sys.exit(-1)
 
     # Command-line arguments for Glue integration
+    # Several tables can be processed in one job as matching comma-separated lists
     input_database = sys.argv[1]
-    input_table_name = sys.argv[2]
+    input_table_names = [t.strip() for t in sys.argv[2].split(',')]
     output_database = sys.argv[3]
-    output_table_name = sys.argv[4]
+    output_table_names = [t.strip() for t in sys.argv[4].split(',')]
     columns_str = sys.argv[5]
     columns_to_keep = [c.strip() for c in columns_str.split(',')]
+    # Optional output partitioning; pass an empty string to skip partition columns
+    partition_columns = [c.strip() for c in sys.argv[6].split(',') if c.strip()] if len(sys.argv) > 6 else None
+    output_partitions = int(sys.argv[7]) if len(sys.argv) > 7 else None
+
+    if len(input_table_names) != len(output_table_names):
+        print("Error: <input_tables> and <output_tables> must list the same number of tables.")
+        sys.exit(-1)
+
+    # Build the SparkSession once and reuse it for every table
+    spark_session = create_spark_session()
 
     # Call the main processing function
-    process_glue_data(input_database, input_table_name, output_database, output_table_name, columns_to_keep)
\ No newline at end of file
+    for input_table_name, output_table_name in zip(input_table_names, output_table_names):
+        process_glue_data(spark_session, input_database, input_table_name, output_database, output_table_name,
+                          columns_to_keep, partition_by=partition_columns, num_partitions=output_partitions)
+
+    # Stop the SparkSession
+    spark_session.stop()
+    print("SparkSession stopped.")
\ No newline at end of file